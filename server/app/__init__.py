@@ -8,6 +8,7 @@ from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 from .models import db  # Import db from models.py
 from .routes import main_bp, auth_bp
+from .cli import register_commands
 
 def create_app():
     # Load environment variables from the .env file
@@ -35,6 +36,18 @@ def create_app():
     # Get from environment variables. This MUST be a strong, unique, and secret key.
     app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'dev-jwt-secret-key') # Default for local dev
 
+    # Password hashing: method/cost used for new hashes (existing hashes are upgraded on login),
+    # number of worker processes (0 = hash on the request thread), and how many hashes may be
+    # running or queued before new register/login requests get HTTP 429.
+    app.config['PASSWORD_HASH_METHOD'] = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256')
+    app.config['PASSWORD_HASH_WORKERS'] = int(os.getenv('PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+    app.config['PASSWORD_HASH_MAX_QUEUE'] = int(os.getenv('PASSWORD_HASH_MAX_QUEUE', 32))
+
+    # Admin users: comma-separated list of emails allowed to use the /admin endpoints.
+    app.config['ADMIN_EMAILS'] = {
+        email.strip().lower() for email in os.getenv('ADMIN_EMAILS', '').split(',') if email.strip()
+    }
+
     # --- Initialize Extensions with the Flask App ---
 
     # Initialize SQLAlchemy with the Flask app instance
@@ -49,4 +62,9 @@ def create_app():
     app.register_blueprint(main_bp)
     app.register_blueprint(auth_bp)
 
+    # --- Register CLI Commands ---
+    # Schema creation/verification lives in `flask init-db` / `flask check-db`
+    # rather than running on every startup.
+    register_commands(app)
+
     return app
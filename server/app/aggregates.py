@@ -0,0 +1,183 @@
+# server/app/aggregates.py
+# Platform-wide per-coin aggregates (holders, total quantity, daily flows).
+# Writers record deltas into the aggregate tables in the same DB transaction as the
+# underlying change, so reads never scan portfolio_holdings or transactions.
+# reconcile_aggregates() recomputes everything from the base tables to catch drift.
+
+from datetime import date
+
+from .models import db, Transaction, PortfolioHolding, CoinAggregate, CoinDailyFlow
+
+# Float sums accumulated incrementally won't match a fresh SUM() exactly; differences
+# smaller than this are not reported as drift.
+RECONCILE_TOLERANCE = 1e-6
+
+# Tables maintained by this module (backfilled by `flask init-db` when first created).
+AGGREGATE_TABLES = {CoinAggregate.__tablename__, CoinDailyFlow.__tablename__}
+
+
+def new_deltas():
+    # Empty accumulator for add_transaction_delta / apply_aggregate_deltas.
+    # Bulk paths add many transactions to one accumulator and apply it once.
+    return {'coins': {}, 'flows': {}}
+
+
+def add_transaction_delta(deltas, crypto_id, transaction_type, quantity, fiat_value,
+                          transaction_date, holder_delta, quantity_delta):
+    # Add one transaction's effect to the accumulator.
+    # holder_delta is +1 when a holding was created, -1 when it was deleted, else 0.
+    # quantity_delta is the change in the holding's quantity (including any dust removed on delete).
+    coin = deltas['coins'].setdefault(crypto_id, {'holders': 0, 'total_quantity': 0.0})
+    coin['holders'] += holder_delta
+    coin['total_quantity'] += quantity_delta
+
+    flow = deltas['flows'].setdefault((crypto_id, transaction_date.date()), {
+        'buy_quantity': 0.0, 'sell_quantity': 0.0, 'buy_value': 0.0, 'sell_value': 0.0, 'num_transactions': 0
+    })
+    flow[f'{transaction_type}_quantity'] += quantity
+    flow[f'{transaction_type}_value'] += fiat_value
+    flow['num_transactions'] += 1
+
+
+def _increment(model, key, increments):
+    # Atomically add `increments` to the row identified by `key`, inserting it if missing.
+    # Uses INSERT ... ON CONFLICT DO UPDATE SET col = col + excluded.col where available,
+    # so concurrent writers never lose each other's updates.
+    table = model.__table__
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        # Imported here: loading the PostgreSQL dialect package costs tens of ms at worker startup
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).values(**key, **increments)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(key),
+            set_={name: table.c[name] + stmt.excluded[name] for name in increments}
+        )
+        db.session.execute(stmt)
+        return
+
+    where = [table.c[name] == value for name, value in key.items()]
+    updated = db.session.execute(
+        table.update().where(*where).values({name: table.c[name] + value for name, value in increments.items()})
+    )
+    if updated.rowcount == 0:
+        db.session.execute(table.insert().values(**key, **increments))
+
+
+def apply_aggregate_deltas(deltas):
+    # Write accumulated deltas to the aggregate tables. Does not commit; call it inside
+    # the same session transaction as the transaction/holding changes.
+    for crypto_id, increments in deltas['coins'].items():
+        _increment(CoinAggregate, {'crypto_id': crypto_id}, increments)
+    for (crypto_id, day), increments in deltas['flows'].items():
+        _increment(CoinDailyFlow, {'crypto_id': crypto_id, 'day': day}, increments)
+
+
+def _compute_from_base_tables():
+    # Recompute aggregates with GROUP BY queries over the base tables.
+    coins = {}
+    holding_rows = db.session.execute(
+        db.select(
+            PortfolioHolding.crypto_id,
+            db.func.count(PortfolioHolding.id),
+            db.func.sum(PortfolioHolding.quantity),
+        ).group_by(PortfolioHolding.crypto_id)
+    )
+    for crypto_id, holders, total_quantity in holding_rows:
+        coins[crypto_id] = {'holders': holders, 'total_quantity': total_quantity or 0.0}
+
+    def sum_where(transaction_type, column):
+        return db.func.sum(db.case((Transaction.transaction_type == transaction_type, column), else_=0.0))
+
+    flows = {}
+    day_column = db.func.date(Transaction.transaction_date)
+    flow_rows = db.session.execute(
+        db.select(
+            Transaction.crypto_id,
+            day_column,
+            sum_where('buy', Transaction.quantity),
+            sum_where('sell', Transaction.quantity),
+            sum_where('buy', Transaction.fiat_value),
+            sum_where('sell', Transaction.fiat_value),
+            db.func.count(Transaction.id),
+        ).group_by(Transaction.crypto_id, day_column)
+    )
+    for crypto_id, day, buy_quantity, sell_quantity, buy_value, sell_value, count in flow_rows:
+        # SQLite returns date() as a string, PostgreSQL as a date
+        day = day if isinstance(day, date) else date.fromisoformat(day)
+        flows[(crypto_id, day)] = {
+            'buy_quantity': buy_quantity or 0.0,
+            'sell_quantity': sell_quantity or 0.0,
+            'buy_value': buy_value or 0.0,
+            'sell_value': sell_value or 0.0,
+            'num_transactions': count,
+        }
+    return coins, flows
+
+
+def _diff(label, expected, actual):
+    # Describe fields where the stored aggregate differs from the recomputed one.
+    problems = []
+    for name, value in expected.items():
+        stored = actual.get(name, 0)
+        if abs(stored - value) > RECONCILE_TOLERANCE * max(1.0, abs(value)):
+            problems.append(f"{label} {name}: stored {stored}, expected {value}")
+    return problems
+
+
+def _lock_aggregate_tables():
+    # Make aggregate writers (add_transaction's increments) wait until this transaction ends.
+    # Any writer that already touched the aggregates has committed by the time the lock is
+    # granted, so the base tables read next match the stored aggregates; writers still in
+    # flight apply their increments after ours. Other databases rely on the corrections
+    # below being increments rather than a delete and re-insert.
+    if db.session.get_bind().dialect.name == 'postgresql':
+        tables = ', '.join(sorted(AGGREGATE_TABLES))
+        db.session.execute(db.text(f'LOCK TABLE {tables} IN EXCLUSIVE MODE'))
+
+
+def reconcile_aggregates(fix=False):
+    # Verify the aggregate tables against the base tables.
+    # Returns a list of human-readable mismatches. With fix=True each mismatching row is
+    # corrected by adding (expected - stored), and the corrections are committed.
+    if fix:
+        _lock_aggregate_tables()
+    coins, flows = _compute_from_base_tables()
+    stored_coins = {row.crypto_id: row.to_dict() for row in CoinAggregate.query.all()}
+    stored_flows = {(row.crypto_id, row.day): row.to_dict() for row in CoinDailyFlow.query.all()}
+
+    empty_coin = {'holders': 0, 'total_quantity': 0.0}
+    empty_flow = {'buy_quantity': 0.0, 'sell_quantity': 0.0, 'buy_value': 0.0, 'sell_value': 0.0, 'num_transactions': 0}
+
+    def corrections(expected, stored):
+        return {name: value - stored.get(name, 0) for name, value in expected.items()}
+
+    problems = []
+    coin_corrections = {}
+    flow_corrections = {}
+    for crypto_id in coins.keys() | stored_coins.keys():
+        expected = coins.get(crypto_id, empty_coin)
+        stored = stored_coins.get(crypto_id, {})
+        found = _diff(f"coin {crypto_id}", expected, stored)
+        if found:
+            problems += found
+            coin_corrections[crypto_id] = corrections(expected, stored)
+    for key in flows.keys() | stored_flows.keys():
+        expected = flows.get(key, empty_flow)
+        stored = stored_flows.get(key, {})
+        found = _diff(f"coin {key[0]} on {key[1]}", expected, stored)
+        if found:
+            problems += found
+            flow_corrections[key] = corrections(expected, stored)
+
+    if fix:
+        for crypto_id, increments in coin_corrections.items():
+            _increment(CoinAggregate, {'crypto_id': crypto_id}, increments)
+        for (crypto_id, day), increments in flow_corrections.items():
+            _increment(CoinDailyFlow, {'crypto_id': crypto_id, 'day': day}, increments)
+        # Also ends the transaction (and releases the lock) when nothing needed fixing
+        db.session.commit()
+    return problems
@@ -0,0 +1,92 @@
+# server/app/cli.py
+# Flask CLI commands for managing the database schema and maintenance jobs.
+# Schema work happens here (e.g. `flask init-db` before deploying) instead of on every app start,
+# so workers boot without touching the database.
+
+import click
+from sqlalchemy import inspect, text
+
+from .models import db
+from .aggregates import AGGREGATE_TABLES, reconcile_aggregates
+
+
+def find_schema_problems():
+    # Compare the models against the live database.
+    # Returns (missing_tables, missing_columns) where missing_columns is a list of Column objects.
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    missing_tables = []
+    missing_columns = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            missing_tables.append(table.name)
+            continue
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing_columns:
+                missing_columns.append(column)
+    return missing_tables, missing_columns
+
+
+def add_missing_column(column):
+    # ALTER TABLE ... ADD COLUMN for a column added to a model after its table was created.
+    # Only possible when existing rows can be filled in (nullable or has a server default).
+    column_type = column.type.compile(dialect=db.engine.dialect)
+    ddl = f'ALTER TABLE {column.table.name} ADD COLUMN {column.name} {column_type}'
+    if column.server_default is not None:
+        ddl += f" DEFAULT '{column.server_default.arg}'"
+    if not column.nullable:
+        ddl += ' NOT NULL'
+    with db.engine.begin() as connection:
+        connection.execute(text(ddl))
+
+
+def register_commands(app):
+    # Attach the schema commands to the app's `flask` CLI.
+
+    @app.cli.command('init-db')
+    def init_db():
+        """Create missing tables and add missing columns."""
+        missing_tables, _ = find_schema_problems()
+        db.create_all()
+        _, missing_columns = find_schema_problems()
+        for column in missing_columns:
+            if not column.nullable and column.server_default is None:
+                click.echo(f"Cannot add {column.table.name}.{column.name}: NOT NULL without a server default")
+                continue
+            add_missing_column(column)
+            click.echo(f"Added column {column.table.name}.{column.name}")
+        # Newly created aggregate tables start empty; fill them from existing holdings/transactions
+        # so incremental updates don't start from zero (e.g. holders = -1 after the first sell).
+        if AGGREGATE_TABLES & set(missing_tables):
+            reconcile_aggregates(fix=True)
+            click.echo("Backfilled platform aggregates.")
+        click.echo("Database tables checked/created.")
+
+    @app.cli.command('check-db')
+    def check_db():
+        """Verify the database schema matches the models (exits 1 if not)."""
+        missing_tables, missing_columns = find_schema_problems()
+        for table_name in missing_tables:
+            click.echo(f"Missing table: {table_name}")
+        for column in missing_columns:
+            click.echo(f"Missing column: {column.table.name}.{column.name}")
+        if missing_tables or missing_columns:
+            click.echo("Schema is out of date. Run `flask init-db`.")
+            raise SystemExit(1)
+        click.echo("Schema OK.")
+
+    @app.cli.command('reconcile-aggregates')
+    @click.option('--fix', is_flag=True, help="Rewrite the aggregate tables from the base tables if they differ.")
+    def reconcile_aggregates_command(fix):
+        """Verify platform aggregates against holdings/transactions (exits 1 on drift unless --fix)."""
+        problems = reconcile_aggregates(fix=fix)
+        for problem in problems:
+            click.echo(problem)
+        if not problems:
+            click.echo("Aggregates OK.")
+        elif fix:
+            click.echo(f"Rebuilt aggregates ({len(problems)} mismatches fixed).")
+        else:
+            click.echo(f"{len(problems)} mismatches found. Run with --fix to rebuild.")
+            raise SystemExit(1)
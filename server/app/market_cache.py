@@ -0,0 +1,150 @@
+# server/app/market_cache.py
+# Shared, pre-serialized response cache for the public top-100 market list (/cryptos).
+# The list is the same for every user, so it is built once, encoded to JSON bytes
+# (plus gzip/brotli variants) and served from memory with stale-while-revalidate:
+#   - fresh (< MARKET_FRESH_SECONDS old): served as is
+#   - stale (< MARKET_STALE_SECONDS old): served as is while one background thread refreshes it
+#   - older or missing: refreshed synchronously
+
+import gzip
+import hashlib
+import json
+import threading
+import time
+
+from .models import Crypto
+
+# How long the cached market list is served without refreshing.
+MARKET_FRESH_SECONDS = 60
+
+# How long a stale market list may still be served while a refresh runs in the background.
+MARKET_STALE_SECONDS = 600
+
+# Current cache entry. Replaced as a whole (never mutated) so readers need no lock.
+_market_entry = None
+_market_refresh_lock = threading.Lock()
+
+
+def _fetch_market_list():
+    # Top 100 coins from CoinGecko, reduced to the fields the frontend uses.
+    import requests  # Imported lazily to keep app startup fast
+    url = "https://api.coingecko.com/api/v3/coins/markets"
+    params = {
+        'vs_currency': 'usd',
+        'order': 'market_cap_desc',
+        'per_page': 100,
+        'page': 1,
+        'sparkline': 'false'
+    }
+    response = requests.get(url, params=params, timeout=10)
+    response.raise_for_status()
+    return [
+        {
+            'id': coin['id'],
+            'symbol': coin['symbol'],
+            'name': coin['name'],
+            'current_price': coin['current_price'],
+            'market_cap': coin['market_cap'],
+            'image': coin['image'],
+            'price_change_percentage_24h': coin.get('price_change_percentage_24h'),
+        }
+        for coin in response.json()
+    ]
+
+
+def _db_market_list():
+    # Fallback built from our own cryptocurrencies table, in the same shape as _fetch_market_list.
+    return [
+        {
+            'id': crypto.api_id,
+            'symbol': crypto.symbol.lower(),
+            'name': crypto.name,
+            'current_price': crypto.last_updated_price,
+            'market_cap': None,
+            'image': crypto.logo_url,
+            'price_change_percentage_24h': None,
+        }
+        for crypto in Crypto.query.all()
+    ]
+
+
+def _compress_brotli(body):
+    # Brotli is optional; without the package only gzip/identity are offered.
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli.compress(body)
+
+
+def _build_entry(result, from_upstream):
+    # fetched_at: last refresh attempt (drives freshness/retries).
+    # data_fetched_at: when the data itself was fetched (bounds how long it may be served).
+    # etags: one strong ETag per encoding, since each content-coding is a different representation.
+    body = json.dumps(result, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    digest = hashlib.sha1(body).hexdigest()
+    now = time.time()
+    return {
+        'identity': body,
+        'gzip': gzip.compress(body),
+        'br': _compress_brotli(body),
+        'etags': {encoding: f'{digest}-{encoding}' for encoding in ('identity', 'gzip', 'br')},
+        'fetched_at': now,
+        'data_fetched_at': now,
+        'from_upstream': from_upstream,
+    }
+
+
+def _refresh_market_entry():
+    # Rebuild the cache entry. On upstream failure keep the previous upstream list while its
+    # data is younger than MARKET_STALE_SECONDS, otherwise fall back to the database list.
+    # Either way fetched_at is reset, so the next retry is a full fresh window away.
+    global _market_entry
+    try:
+        _market_entry = _build_entry(_fetch_market_list(), from_upstream=True)
+    except Exception as e:
+        print(f"CoinGecko API error: {e}")
+        previous = _market_entry
+        now = time.time()
+        if previous and previous['from_upstream'] and now - previous['data_fetched_at'] < MARKET_STALE_SECONDS:
+            _market_entry = dict(previous, fetched_at=now)
+        else:
+            _market_entry = _build_entry(_db_market_list(), from_upstream=False)
+
+
+def _refresh_in_background(app):
+    def run():
+        try:
+            with app.app_context():
+                _refresh_market_entry()
+        finally:
+            _market_refresh_lock.release()
+    threading.Thread(target=run, daemon=True).start()
+
+
+def get_market_entry(app):
+    # Return the current cache entry, refreshing it according to its age.
+    # `app` is the real Flask app object, needed to run the background refresh in an app context.
+    entry = _market_entry
+    age = time.time() - entry['fetched_at'] if entry else None
+    if entry and age < MARKET_FRESH_SECONDS:
+        return entry
+    if entry and age < MARKET_STALE_SECONDS:
+        # Serve stale; only the first request to get the lock starts a refresh.
+        if _market_refresh_lock.acquire(blocking=False):
+            _refresh_in_background(app)
+        return entry
+    # Missing or too old: refresh now. Other requests wait and then reuse the result.
+    with _market_refresh_lock:
+        if _market_entry is entry:
+            _refresh_market_entry()
+    return _market_entry
+
+
+def choose_encoding(entry, accept_encodings):
+    # Pick the best pre-compressed variant the client accepts: br, then gzip, then identity.
+    if entry['br'] is not None and accept_encodings['br']:
+        return 'br'
+    if accept_encodings['gzip']:
+        return 'gzip'
+    return 'identity'
@@ -28,6 +28,10 @@ class User(db.Model):
     # Profile Picture: URL to the user's profile picture (optional, for Google OAuth users)
     profile_picture = db.Column(db.String(500), nullable=True)
 
+    # Display Currency: Fiat currency code (e.g., 'usd', 'eur') used when returning values to this user.
+    # Prices are always stored and fetched in USD and converted on the way out.
+    display_currency = db.Column(db.String(10), default='usd', server_default='usd', nullable=False)
+
     # Creation Timestamp: Automatically set when a new user is created
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
@@ -56,6 +60,7 @@ class User(db.Model):
             'username': self.username,
             'email': self.email,
             'profile_picture': self.profile_picture,
+            'display_currency': self.display_currency,
             'created_at': self.created_at.isoformat() + 'Z', # ISO format for date/time + Z for UTC
             'updated_at': self.updated_at.isoformat() + 'Z'
         }
@@ -214,3 +219,68 @@ class PortfolioHolding(db.Model):
             'crypto_logo_url': self.crypto.logo_url if hasattr(self, 'crypto') and self.crypto else None,
             'username': self.user.username if hasattr(self, 'user') and self.user else None, # Assuming 'user' backref exists
         }
+
+
+# CoinAggregate Model: Represents the 'coin_aggregates' table
+# Platform-wide totals per cryptocurrency across all users' portfolio holdings.
+# Maintained incrementally on every transaction write (see aggregates.py) and
+# periodically verified against portfolio_holdings by `flask reconcile-aggregates`.
+class CoinAggregate(db.Model):
+    __tablename__ = 'coin_aggregates'
+
+    # Primary Key / Foreign Key to Crypto: one row per cryptocurrency
+    crypto_id = db.Column(db.Integer, db.ForeignKey('cryptocurrencies.id'), primary_key=True)
+
+    # Holders: Number of users with a non-empty holding of this cryptocurrency
+    holders = db.Column(db.Integer, default=0, nullable=False)
+
+    # Total Quantity: Sum of all users' holdings of this cryptocurrency
+    total_quantity = db.Column(db.Float, default=0.0, nullable=False)
+
+    def __repr__(self):
+        return f"<CoinAggregate Crypto:{self.crypto_id}, Holders:{self.holders}, Qty:{self.total_quantity}>"
+
+    def to_dict(self):
+        return {
+            'crypto_id': self.crypto_id,
+            'holders': self.holders,
+            'total_quantity': self.total_quantity,
+        }
+
+
+# CoinDailyFlow Model: Represents the 'coin_daily_flows' table
+# Per-coin, per-day buy/sell totals across all users, derived from transactions.
+# Maintained incrementally alongside CoinAggregate.
+class CoinDailyFlow(db.Model):
+    __tablename__ = 'coin_daily_flows'
+
+    # Composite Primary Key: cryptocurrency + calendar day (UTC) of the transactions
+    crypto_id = db.Column(db.Integer, db.ForeignKey('cryptocurrencies.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+
+    # Quantities bought and sold on this day
+    buy_quantity = db.Column(db.Float, default=0.0, nullable=False)
+    sell_quantity = db.Column(db.Float, default=0.0, nullable=False)
+
+    # Fiat (USD) value bought and sold on this day
+    buy_value = db.Column(db.Float, default=0.0, nullable=False)
+    sell_value = db.Column(db.Float, default=0.0, nullable=False)
+
+    # Number of transactions on this day
+    num_transactions = db.Column(db.Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return (f"<CoinDailyFlow Crypto:{self.crypto_id}, Day:{self.day}, "
+                f"Buy:{self.buy_value}, Sell:{self.sell_value}>")
+
+    def to_dict(self):
+        return {
+            'crypto_id': self.crypto_id,
+            'day': self.day.isoformat(),
+            'buy_quantity': self.buy_quantity,
+            'sell_quantity': self.sell_quantity,
+            'buy_value': self.buy_value,
+            'sell_value': self.sell_value,
+            'net_flow': self.buy_value - self.sell_value,
+            'num_transactions': self.num_transactions,
+        }
@@ -0,0 +1,127 @@
+# server/app/passwords.py
+# Password hashing off the request thread.
+# pbkdf2/scrypt hashes are deliberately CPU-heavy; running them on request threads lets a
+# login burst starve every other route. Hashes run in a bounded process pool instead, and
+# when too many are already queued we refuse immediately (PasswordHashingBusy -> HTTP 429)
+# rather than letting requests pile up.
+
+import multiprocessing
+import secrets
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+
+# Pool and queue-depth semaphore, created on first use with the app's config.
+_pool = None
+_slots = None
+_pool_lock = threading.Lock()
+
+# Hash of a random password per hash method, checked against when the user doesn't exist.
+_dummy_hashes = {}
+
+
+class PasswordHashingBusy(Exception):
+    # Raised when PASSWORD_HASH_MAX_QUEUE hashes are already running or queued.
+    pass
+
+
+def _get_pool():
+    # Create the worker pool on first use (keeps startup fast) and return it.
+    # Returns None when PASSWORD_HASH_WORKERS is 0, meaning hash inline.
+    global _pool, _slots
+    workers = current_app.config['PASSWORD_HASH_WORKERS']
+    if workers <= 0:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # The semaphore outlives replaced pools: futures of a broken pool still release their slot.
+                if _slots is None:
+                    _slots = threading.BoundedSemaphore(current_app.config['PASSWORD_HASH_MAX_QUEUE'])
+                # 'spawn' so workers don't inherit a fork of a multi-threaded server process
+                _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    return _pool
+
+
+def _discard_pool(broken):
+    # A worker died (OOM kill, segfault) and the executor refuses all further work.
+    # Drop it so the next _get_pool() starts a fresh one.
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False)
+
+
+def _run(fn, *args):
+    # Run fn(*args) in the pool and wait for the result, or raise PasswordHashingBusy
+    # without waiting if the queue is already full. If the pool turns out to be broken
+    # it is replaced and the call retried once; a second failure is reported as busy.
+    for _ in range(2):
+        pool = _get_pool()
+        if pool is None:
+            return fn(*args)
+        if not _slots.acquire(blocking=False):
+            raise PasswordHashingBusy()
+        try:
+            future = pool.submit(fn, *args)
+        except BrokenProcessPool:
+            _slots.release()
+            _discard_pool(pool)
+            continue
+        except Exception:
+            _slots.release()
+            raise
+        future.add_done_callback(lambda _: _slots.release())
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            _discard_pool(pool)
+    raise PasswordHashingBusy()
+
+
+def _normalized_method(method):
+    # Spell out the default cost parameters werkzeug fills in, so the configured method can be
+    # compared with the prefix of a stored hash (e.g. 'pbkdf2:sha256' -> 'pbkdf2:sha256:1000000').
+    parts = method.split(':')
+    if parts[0] == 'pbkdf2':
+        hash_name = parts[1] if len(parts) > 1 else 'sha256'
+        iterations = parts[2] if len(parts) > 2 else DEFAULT_PBKDF2_ITERATIONS
+        return f'pbkdf2:{hash_name}:{iterations}'
+    if parts[0] == 'scrypt':
+        n, r, p = (parts[1:] + ['32768', '8', '1'][len(parts) - 1:])[:3]
+        return f'scrypt:{n}:{r}:{p}'
+    return method
+
+
+def hash_password(password):
+    # Hash with the configured PASSWORD_HASH_METHOD. May raise PasswordHashingBusy.
+    return _run(generate_password_hash, password, current_app.config['PASSWORD_HASH_METHOD'])
+
+
+def verify_password(password_hash, password):
+    # Check a password against a stored hash. May raise PasswordHashingBusy.
+    # Accounts without a password (Google sign-in) never match and don't use the pool.
+    if not password_hash:
+        return False
+    return _run(check_password_hash, password_hash, password)
+
+
+def dummy_password_hash():
+    # A hash made with the configured method that no password matches. Logins for unknown
+    # users (or accounts without a password) verify against it, so they take the same time
+    # and hit the same queue limit as real ones and don't reveal which usernames exist.
+    # Computed once per method; may raise PasswordHashingBusy.
+    method = current_app.config['PASSWORD_HASH_METHOD']
+    if method not in _dummy_hashes:
+        _dummy_hashes[method] = hash_password(secrets.token_hex(16))
+    return _dummy_hashes[method]
+
+
+def needs_rehash(password_hash):
+    # True if the stored hash was made with a different method or cost than currently configured.
+    method = password_hash.split('$', 1)[0]
+    return method != _normalized_method(current_app.config['PASSWORD_HASH_METHOD'])
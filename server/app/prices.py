@@ -0,0 +1,170 @@
+# server/app/prices.py
+# Versioned, immutable price snapshots shared by all portfolio computations.
+# The pipeline builds a complete PriceSnapshot (live CoinGecko prices, falling back to each
+# coin's cached Crypto.last_updated_price) and publishes it by swapping a single reference,
+# so readers never lock and never see a half-updated set of prices. Each request binds to one
+# snapshot (flask.g) and reports its id and per-coin price age, so /portfolio and
+# /portfolio/summary agree and any result can be reproduced with ?snapshot=<id>.
+
+import itertools
+import threading
+import uuid
+from collections import namedtuple
+from datetime import datetime
+from types import MappingProxyType
+
+from flask import g, request, current_app
+
+from .models import db, Crypto
+from .utils import fetch_usd_prices
+
+# How long (seconds) a published snapshot is reused before prices are fetched again.
+PRICE_SNAPSHOT_TTL = 30
+
+# How many recent snapshots are kept so clients can pin a request to one with ?snapshot=<id>.
+PRICE_SNAPSHOT_HISTORY = 20
+
+# One coin's USD price inside a snapshot.
+# source is 'live' (CoinGecko), 'cached' (Crypto.last_updated_price) or None (no price known).
+# as_of is when that price was fetched (naive UTC), or None if unknown.
+PriceQuote = namedtuple('PriceQuote', ['price', 'as_of', 'source'])
+
+# An immutable set of quotes keyed by CoinGecko api_id.
+# id is '<boot token>-<n>': unique across worker processes and restarts, so a snapshot id
+# issued by another worker is reported as expired instead of resolving to different prices.
+PriceSnapshot = namedtuple('PriceSnapshot', ['id', 'created_at', 'quotes'])
+
+_MISSING_QUOTE = PriceQuote(None, None, None)
+
+_BOOT_TOKEN = uuid.uuid4().hex[:12]
+_snapshot_numbers = itertools.count(1)
+
+# Latest snapshot, and recent ones (oldest first). Both are replaced, never mutated.
+_current_snapshot = PriceSnapshot(f'{_BOOT_TOKEN}-0', datetime.min, MappingProxyType({}))
+_recent_snapshots = ()
+_publish_lock = threading.Lock()
+
+
+class SnapshotExpired(Exception):
+    # Raised when ?snapshot=<id> names a snapshot that is no longer retained.
+    pass
+
+
+class SnapshotIncomplete(Exception):
+    # Raised when ?snapshot=<id> names a snapshot taken before some of the requested coins
+    # were held, so it has no quote for them.
+    pass
+
+
+def _build_snapshot(previous, api_ids, refresh_all):
+    # Build the next snapshot. Coins being refreshed get live prices where CoinGecko has them;
+    # otherwise they keep their previous quote, or fall back to the DB cached price.
+    # Coins with no price at all still get a (missing) quote, so the snapshot records that
+    # they were looked up and they don't trigger another fetch until the TTL expires.
+    now = datetime.utcnow()
+    to_fetch = set(api_ids) | set(previous.quotes) if refresh_all else set(api_ids) - set(previous.quotes)
+    live_prices = fetch_usd_prices(sorted(to_fetch))
+
+    quotes = dict(previous.quotes)
+    for api_id, price in live_prices.items():
+        quotes[api_id] = PriceQuote(price, now, 'live')
+
+    unpriced = [api_id for api_id in to_fetch if quotes.get(api_id, _MISSING_QUOTE).price is None]
+    if unpriced:
+        cached = db.session.execute(
+            db.select(Crypto.api_id, Crypto.last_updated_price, Crypto.last_price_fetch_time)
+            .where(Crypto.api_id.in_(unpriced))
+        )
+        for api_id, price, fetched_at in cached:
+            if price is not None:
+                quotes[api_id] = PriceQuote(price, fetched_at, 'cached')
+    for api_id in unpriced:
+        quotes.setdefault(api_id, _MISSING_QUOTE)
+    return PriceSnapshot(f'{_BOOT_TOKEN}-{next(_snapshot_numbers)}', now, MappingProxyType(quotes))
+
+
+def _publish(snapshot):
+    global _current_snapshot, _recent_snapshots
+    _recent_snapshots = (_recent_snapshots + (snapshot,))[-PRICE_SNAPSHOT_HISTORY:]
+    _current_snapshot = snapshot
+
+
+def _is_expired(snapshot):
+    return (datetime.utcnow() - snapshot.created_at).total_seconds() >= PRICE_SNAPSHOT_TTL
+
+
+def _covers(snapshot, api_ids):
+    return all(api_id in snapshot.quotes for api_id in api_ids)
+
+
+def _refresh_in_background(app):
+    # Called with _publish_lock held; the thread releases it when the new snapshot is published.
+    def run():
+        try:
+            with app.app_context():
+                _publish(_build_snapshot(_current_snapshot, (), refresh_all=True))
+        finally:
+            _publish_lock.release()
+    threading.Thread(target=run, daemon=True).start()
+
+
+def current_snapshot(api_ids, app):
+    # Return the latest published snapshot.
+    # - Covers api_ids and is fresh: returned as is.
+    # - Covers api_ids but is older than PRICE_SNAPSHOT_TTL: returned as is while one background
+    #   thread publishes a refreshed one, so readers never wait on upstream.
+    # - Missing some api_ids: those are fetched now (the only case where a reader waits).
+    # `app` is the real Flask app object, needed to run the background refresh in an app context.
+    snapshot = _current_snapshot
+    if _covers(snapshot, api_ids):
+        if _is_expired(snapshot) and _publish_lock.acquire(blocking=False):
+            _refresh_in_background(app)
+        return snapshot
+    with _publish_lock:
+        # Another request may have published while we waited for the lock
+        snapshot = _current_snapshot
+        if not _covers(snapshot, api_ids):
+            snapshot = _build_snapshot(snapshot, api_ids, refresh_all=_is_expired(snapshot))
+            _publish(snapshot)
+    return snapshot
+
+
+def find_snapshot(snapshot_id):
+    # Look up a recently published snapshot by id, or raise SnapshotExpired.
+    for snapshot in _recent_snapshots:
+        if snapshot.id == snapshot_id:
+            return snapshot
+    raise SnapshotExpired(snapshot_id)
+
+
+def request_snapshot(api_ids):
+    # The snapshot bound to the current request. The first call binds it (to ?snapshot=<id>
+    # if given, else the current snapshot) and every later call in the request reuses it.
+    # A pinned snapshot must cover api_ids (SnapshotIncomplete otherwise): valuing the
+    # missing coins at zero would return a wrong result labelled as reproducible.
+    snapshot = g.get('price_snapshot')
+    if snapshot is None:
+        pinned_id = request.args.get('snapshot')
+        if pinned_id:
+            snapshot = find_snapshot(pinned_id)
+            missing = [api_id for api_id in api_ids if api_id not in snapshot.quotes]
+            if missing:
+                raise SnapshotIncomplete(pinned_id, missing)
+        else:
+            snapshot = current_snapshot(api_ids, current_app._get_current_object())
+        g.price_snapshot = snapshot
+    return snapshot
+
+
+def get_quote(snapshot, api_id):
+    # The coin's quote in this snapshot (price None if the snapshot has no price for it).
+    return snapshot.quotes.get(api_id, _MISSING_QUOTE)
+
+
+def describe_quote(quote):
+    # Price freshness fields reported alongside values computed from a quote.
+    return {
+        'price_source': quote.source,
+        'price_as_of': quote.as_of.isoformat() + 'Z' if quote.as_of else None,
+        'price_age_seconds': (datetime.utcnow() - quote.as_of).total_seconds() if quote.as_of else None,
+    }
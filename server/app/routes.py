@@ -1,23 +1,97 @@
 # server/app/routes.py
 # API endpoints for the crypto tracker app.
 
-from flask import Blueprint, request, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app
+from functools import wraps
 # Import JWT-Extended components
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-import requests # For making external API calls (e.g., to CoinGecko)
-from datetime import datetime
-from google.oauth2 import id_token
-from google.auth.transport import requests as google_requests
+from datetime import datetime, MINYEAR, MAXYEAR
+# Note: `requests` and the google-auth packages are imported inside the routes that use them,
+# so importing this module (and starting a worker) doesn't pay for them up front.
 
 # Import all your models
-from .models import db, User, Crypto, Transaction, PortfolioHolding
+from .models import db, User, Crypto, Transaction, PortfolioHolding, CoinAggregate, CoinDailyFlow
+from .aggregates import new_deltas, add_transaction_delta, apply_aggregate_deltas
+from .market_cache import MARKET_FRESH_SECONDS, get_market_entry, choose_encoding
+from .serializers import transaction_dicts, holding_dicts, crypto_dicts
+from .passwords import PasswordHashingBusy, hash_password, verify_password, dummy_password_hash, needs_rehash
+from .prices import SnapshotExpired, SnapshotIncomplete, request_snapshot, get_quote, describe_quote
+from .utils import (
+    EXPORT_FIELDS, REALIZED_GAIN_FIELDS, iter_transaction_rows, iter_realized_gains,
+    stream_csv, stream_json_array, stream_realized_gains_json,
+    BASE_CURRENCY, get_fiat_rate, get_fiat_rates
+)
 
 # Define a single Blueprint for all routes in this file.
 main_bp = Blueprint('main_api', __name__)
 auth_bp = Blueprint('auth', __name__)
 
 
+def saved_display_currency(user_id):
+    # The user's saved display currency (USD if unset).
+    user = User.query.get(user_id)
+    return user.display_currency if user and user.display_currency else BASE_CURRENCY
+
+
+def resolve_display_currency(user_id):
+    # Pick the currency for this request: ?currency= overrides the user's saved display currency.
+    # Returns (currency, rate per USD), or (currency, None) if an explicit ?currency= isn't supported.
+    # A saved currency whose rate is temporarily unavailable (e.g. CoinGecko down since startup)
+    # falls back to USD instead of failing the request.
+    currency = request.args.get('currency')
+    if currency:
+        currency = currency.lower()
+        return currency, get_fiat_rate(currency)
+    currency = saved_display_currency(user_id)
+    rate = get_fiat_rate(currency)
+    if rate is None:
+        return BASE_CURRENCY, 1.0
+    return currency, rate
+
+
+def admin_required(fn):
+    # Restrict a route to users whose email is listed in the ADMIN_EMAILS config.
+    # Use below @jwt_required() so the identity is already verified.
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        user = User.query.get(get_jwt_identity())
+        if not user or user.email.lower() not in current_app.config['ADMIN_EMAILS']:
+            return jsonify({"message": "Admin access required"}), 403
+        return fn(*args, **kwargs)
+    return wrapper
+
+
+@main_bp.errorhandler(SnapshotExpired)
+def snapshot_expired(e):
+    # ?snapshot=<id> asked for a price snapshot that has already been discarded.
+    return jsonify({"message": f"Price snapshot {e.args[0]} has expired"}), 410
+
+
+@main_bp.errorhandler(SnapshotIncomplete)
+def snapshot_incomplete(e):
+    # ?snapshot=<id> was taken before some of the user's current holdings were bought.
+    snapshot_id, missing = e.args
+    return jsonify({
+        "message": f"Price snapshot {snapshot_id} has no prices for: {', '.join(missing)}",
+        "missing": missing
+    }), 409
+
+
+def hashing_busy_response():
+    # Returned when the password hashing pool is saturated; the client should retry shortly.
+    response = jsonify({"message": "Too many login attempts in progress, please retry shortly"})
+    response.headers['Retry-After'] = '1'
+    return response, 429
+
+
+
+# ----------- HEALTH -----------
+
+@main_bp.route('/health', methods=['GET'])
+def health_check():
+    # Cheap liveness check for load balancers and the startup benchmark. No DB or network access.
+    return jsonify({"status": "ok"}), 200
+
 
 # ----------- USER AUTHENTICATION -----------
 
@@ -28,6 +102,14 @@ def google_auth():
     if not token:
         return jsonify({'message': 'Missing token'}), 400
 
+    # Imported lazily: google-auth is slow to import and only needed for this route.
+    try:
+        from google.oauth2 import id_token
+        from google.auth.transport import requests as google_requests
+    except ImportError as e:
+        print(f"Google auth unavailable: {e}")
+        return jsonify({'message': 'Google sign-in is not available on this server'}), 503
+
     try:
         print(f"Received token: {token[:50]}...")  # Debug: print first 50 chars
         # Verify the token with Google
@@ -69,7 +151,10 @@ def register():
     # Check if user or email is already taken
     if User.query.filter((User.username == username) | (User.email == email)).first():
         return jsonify({"message": "Username or email already exists"}), 409
-    hashed_password = generate_password_hash(password, method='pbkdf2:sha256')
+    try:
+        hashed_password = hash_password(password)
+    except PasswordHashingBusy:
+        return hashing_busy_response()
     new_user = User(username=username, email=email, password_hash=hashed_password)
     try:
         db.session.add(new_user)
@@ -93,8 +178,28 @@ def login():
     username_or_email = data['username']
     password = data['password']
     user = User.query.filter((User.username == username_or_email) | (User.email == username_or_email)).first()
-    if not user or not check_password_hash(user.password_hash, password):
+    try:
+        if user is not None and user.password_hash:
+            valid = verify_password(user.password_hash, password)
+        else:
+            # Do the same work as for a real account so the response doesn't reveal whether it exists
+            verify_password(dummy_password_hash(), password)
+            valid = False
+    except PasswordHashingBusy:
+        return hashing_busy_response()
+    if not valid:
         return jsonify({"message": "Invalid credentials"}), 401
+    # Upgrade hashes made with an older method/cost now that we know the plaintext.
+    # Best effort: if the pool is busy or the commit fails, try again on a later login.
+    if needs_rehash(user.password_hash):
+        try:
+            user.password_hash = hash_password(password)
+            db.session.commit()
+        except PasswordHashingBusy:
+            pass
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error upgrading password hash: {e}")
     access_token = create_access_token(identity=str(user.id))
     return jsonify({
         "message": "Login successful",
@@ -103,41 +208,56 @@ def login():
     }), 200
 
 
+@main_bp.route('/user/settings', methods=['PUT'])
+@jwt_required()
+def update_user_settings():
+    # Update the logged-in user's preferences. Currently only display_currency.
+    current_user_id = get_jwt_identity()
+    data = request.get_json()
+    if not data or not data.get('display_currency'):
+        return jsonify({"message": "Missing display_currency"}), 400
+    if not isinstance(data['display_currency'], str):
+        return jsonify({"message": "display_currency must be a string"}), 400
+    currency = data['display_currency'].lower()
+    if get_fiat_rate(currency) is None:
+        return jsonify({"message": f"Unsupported currency '{currency}'"}), 400
+    user = User.query.get(current_user_id)
+    if not user:
+        return jsonify({"message": "User not found"}), 404
+    user.display_currency = currency
+    db.session.commit()
+    return jsonify({
+        "message": "Settings updated successfully",
+        "user": user.to_dict()
+    }), 200
+
+
+@main_bp.route('/currencies', methods=['GET'])
+def get_supported_currencies():
+    # List the fiat currencies values can be displayed in.
+    return jsonify(sorted(get_fiat_rates().keys())), 200
+
+
 # ----------- CRYPTOCURRENCY ROUTES -----------
 
 @main_bp.route('/cryptos', methods=['GET'])
 @jwt_required()
 def get_all_cryptos():
-    # Get top 100 cryptos from CoinGecko. If that fails, use our DB as backup.
-    try:
-        url = "https://api.coingecko.com/api/v3/coins/markets"
-        params = {
-            'vs_currency': 'usd',
-            'order': 'market_cap_desc',
-            'per_page': 100,
-            'page': 1,
-            'sparkline': 'false'
-        }
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        coins = response.json()
-        result = [
-            {
-                'id': coin['id'],
-                'symbol': coin['symbol'],
-                'name': coin['name'],
-                'current_price': coin['current_price'],
-                'market_cap': coin['market_cap'],
-                'image': coin['image'],
-                'price_change_percentage_24h': coin.get('price_change_percentage_24h'),
-            }
-            for coin in coins
-        ]
-        return jsonify(result), 200
-    except Exception as e:
-        print(f"CoinGecko API error: {e}")
-        cryptos = Crypto.query.all()
-        return jsonify([crypto.to_dict() for crypto in cryptos]), 200
+    # Get top 100 cryptos from CoinGecko (or our DB as backup, same shape).
+    # Served from a shared pre-serialized cache; see market_cache.py.
+    entry = get_market_entry(current_app._get_current_object())
+    encoding = choose_encoding(entry, request.accept_encodings)
+    etag = entry['etags'][encoding]
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(entry[encoding], status=200, mimetype='application/json')
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = f'private, max-age={MARKET_FRESH_SECONDS}'
+    return response
 
 
 @main_bp.route('/cryptos/<string:symbol>', methods=['GET'])
@@ -154,8 +274,7 @@ def get_crypto_by_symbol(symbol):
 @jwt_required()
 def get_db_cryptos():
     # Get all cryptos from our database for transaction modal
-    cryptos = Crypto.query.all()
-    return jsonify([crypto.to_dict() for crypto in cryptos]), 200
+    return jsonify(crypto_dicts()), 200
 
 
 # ----------- TRANSACTIONS -----------
@@ -164,15 +283,76 @@ def get_db_cryptos():
 @jwt_required()
 def get_user_transactions():
     # Get all transactions for the logged-in user, newest first.
+    # Fiat amounts are converted from USD into the user's display currency.
+    current_user_id = get_jwt_identity()
+    currency, rate = resolve_display_currency(current_user_id)
+    if rate is None:
+        return jsonify({"message": f"Unsupported currency '{currency}'"}), 400
+    return jsonify(transaction_dicts(current_user_id, currency, rate)), 200
+
+
+@main_bp.route('/transactions/export', methods=['GET'])
+@jwt_required()
+def export_user_transactions():
+    # Stream all of the logged-in user's transactions (oldest first) as CSV or JSON.
+    # Rows are read in cursor batches and written straight to the response.
+    current_user_id = get_jwt_identity()
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in ['csv', 'json']:
+        return jsonify({"message": "Invalid format. Must be 'csv' or 'json'."}), 400
+    rows = iter_transaction_rows(current_user_id)
+    if export_format == 'csv':
+        body = stream_csv(rows, EXPORT_FIELDS)
+        mimetype = 'text/csv'
+    else:
+        body = stream_json_array(rows, EXPORT_FIELDS)
+        mimetype = 'application/json'
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=transactions.{export_format}'}
+    )
+
+
+@main_bp.route('/transactions/realized-gains', methods=['GET'])
+@jwt_required()
+def export_realized_gains():
+    # Stream a realized gains/losses report (average cost method), one entry per sell.
+    # Optional ?year=YYYY limits the report to sells in that year; earlier buys still count toward cost basis.
     current_user_id = get_jwt_identity()
-    transactions = Transaction.query.filter_by(user_id=current_user_id).order_by(Transaction.transaction_date.desc()).all()
-    return jsonify([tx.to_dict() for tx in transactions]), 200
+    export_format = request.args.get('format', 'json').lower()
+    if export_format not in ['csv', 'json']:
+        return jsonify({"message": "Invalid format. Must be 'csv' or 'json'."}), 400
+    start_date = end_date = None
+    year = request.args.get('year')
+    if year:
+        # end_date is Jan 1 of the following year, so the last valid year is MAXYEAR - 1
+        if not year.isdigit() or not MINYEAR <= int(year) <= MAXYEAR - 1:
+            return jsonify({"message": "Invalid year."}), 400
+        start_date = datetime(int(year), 1, 1)
+        end_date = datetime(int(year) + 1, 1, 1)
+    gains = iter_realized_gains(iter_transaction_rows(current_user_id, end_date=end_date), start_date=start_date)
+    if export_format == 'csv':
+        body = stream_csv(gains, REALIZED_GAIN_FIELDS)
+        mimetype = 'text/csv'
+    else:
+        body = stream_realized_gains_json(gains)
+        mimetype = 'application/json'
+    filename = f'realized-gains-{year}' if year else 'realized-gains'
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}.{export_format}'}
+    )
 
 
 @main_bp.route('/transactions', methods=['POST'])
 @jwt_required()
 def add_transaction():
     # Add a buy or sell transaction for the logged-in user. Updates portfolio too.
+    # price_per_coin is in USD unless the body gives a 'currency', in which case it is converted
+    # to USD at the current exchange rate (even for back-dated trades) and stored in USD,
+    # like every other price in the database.
     current_user_id = get_jwt_identity()
     data = request.get_json()
     required_fields = ['crypto_id', 'quantity', 'price_per_coin', 'transaction_type', 'transaction_date']
@@ -190,6 +370,17 @@ def add_transaction():
     crypto = Crypto.query.get(crypto_id)
     if not crypto:
         return jsonify({"message": "Cryptocurrency not found."}), 404
+    # Clients that don't send 'currency' (e.g. the add-transaction modal) send USD prices
+    currency = BASE_CURRENCY
+    rate = 1.0
+    if data.get('currency'):
+        if not isinstance(data['currency'], str):
+            return jsonify({"message": "currency must be a string"}), 400
+        currency = data['currency'].lower()
+        rate = get_fiat_rate(currency)
+        if rate is None:
+            return jsonify({"message": f"Unsupported currency '{currency}'"}), 400
+    price_per_coin = price_per_coin / rate
     fiat_value = quantity * price_per_coin
     new_transaction = Transaction(
         user_id=current_user_id,
@@ -207,6 +398,9 @@ def add_transaction():
             user_id=current_user_id,
             crypto_id=crypto_id
         ).first()
+        # Track how the holding changes so platform-wide aggregates can be updated in the same commit
+        holder_delta = 0
+        quantity_delta = quantity if transaction_type == 'buy' else -quantity
         if transaction_type == 'buy':
             if holding:
                 # Buying more: update quantity and average price
@@ -225,19 +419,33 @@ def add_transaction():
                     last_updated=datetime.utcnow()
                 )
                 db.session.add(new_holding)
+                holder_delta = 1
         elif transaction_type == 'sell':
             if not holding or holding.quantity < quantity:
                 db.session.rollback()
                 return jsonify({"message": "Cannot sell more quantity than held in portfolio."}), 400
             else:
+                previous_quantity = holding.quantity
                 holding.quantity -= quantity
                 holding.last_updated = datetime.utcnow()
                 if holding.quantity <= 0.0000001:
                     db.session.delete(holding)
+                    holder_delta = -1
+                    quantity_delta = -previous_quantity
+        deltas = new_deltas()
+        add_transaction_delta(
+            deltas, crypto.id, transaction_type, quantity, fiat_value,
+            transaction_date, holder_delta, quantity_delta
+        )
+        apply_aggregate_deltas(deltas)
         db.session.commit()
+        transaction_dict = new_transaction.to_dict()
+        transaction_dict['price_per_coin'] *= rate
+        transaction_dict['fiat_value'] *= rate
+        transaction_dict['currency'] = currency
         return jsonify({
             "message": "Transaction added and portfolio updated successfully",
-            "transaction": new_transaction.to_dict()
+            "transaction": transaction_dict
         }), 201
     except Exception as e:
         db.session.rollback()
@@ -251,55 +459,36 @@ def add_transaction():
 @jwt_required()
 def get_user_portfolio():
     # Get the logged-in user's portfolio, including P&L and live prices from CoinGecko.
+    # Prices are fetched in USD and converted to the user's display currency.
+    # Each holding reports the price snapshot id and how old its price is.
     current_user_id = get_jwt_identity()
-    holdings = PortfolioHolding.query.filter_by(user_id=current_user_id).join(Crypto).all()
+    currency, rate = resolve_display_currency(current_user_id)
+    if rate is None:
+        return jsonify({"message": f"Unsupported currency '{currency}'"}), 400
+    holdings = holding_dicts(current_user_id)
     portfolio_data = []
     
-    # Get current prices from CoinGecko for all cryptos in portfolio
-    crypto_ids = [holding.crypto.api_id for holding in holdings]
-    current_prices = {}
+    # Bind one USD price snapshot (live from CoinGecko, or cached) for every holding
+    snapshot = request_snapshot([holding_dict['crypto']['api_id'] for holding_dict in holdings])
     
-    if crypto_ids:
-        try:
-            # Fetch current prices from CoinGecko
-            url = "https://api.coingecko.com/api/v3/simple/price"
-            params = {
-                'ids': ','.join(crypto_ids),
-                'vs_currencies': 'usd'
-            }
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            current_prices = response.json()
-        except Exception as e:
-            print(f"Error fetching current prices: {e}")
-            # Fallback to cached prices
-            current_prices = {}
-    
-    for holding in holdings:
-        holding_dict = holding.to_dict()
-        
-        # Add crypto object to match frontend expectations
-        holding_dict['crypto'] = {
-            'id': holding.crypto.id,
-            'name': holding.crypto.name,
-            'symbol': holding.crypto.symbol,
-            'api_id': holding.crypto.api_id,
-            'logo_url': holding.crypto.logo_url
-        }
+    for holding_dict in holdings:
+        quote = get_quote(snapshot, holding_dict['crypto']['api_id'])
+        current_price = quote.price or 0
         
-        # Get current price (live from CoinGecko or cached)
-        current_price = current_prices.get(holding.crypto.api_id, {}).get('usd', holding.crypto.last_updated_price)
-        if current_price is None:
-            current_price = holding.crypto.last_updated_price or 0
+        quantity = holding_dict['quantity']
+        average_buy_price = holding_dict['average_buy_price']
+        current_value = quantity * current_price
+        gain_loss = current_value - (quantity * average_buy_price)
+        percentage_change = (gain_loss / (quantity * average_buy_price)) * 100 if (quantity * average_buy_price) else 0
         
-        current_value = holding.quantity * current_price
-        gain_loss = current_value - (holding.quantity * holding.average_buy_price)
-        percentage_change = (gain_loss / (holding.quantity * holding.average_buy_price)) * 100 if (holding.quantity * holding.average_buy_price) else 0
-        
-        holding_dict['current_price'] = current_price
-        holding_dict['current_value'] = current_value
-        holding_dict['gain_loss'] = gain_loss
+        holding_dict['average_buy_price'] = average_buy_price * rate
+        holding_dict['current_price'] = current_price * rate
+        holding_dict['current_value'] = current_value * rate
+        holding_dict['gain_loss'] = gain_loss * rate
         holding_dict['percentage_change'] = percentage_change
+        holding_dict['currency'] = currency
+        holding_dict['price_snapshot_id'] = snapshot.id
+        holding_dict.update(describe_quote(quote))
         portfolio_data.append(holding_dict)
     
     return jsonify(portfolio_data), 200
@@ -309,50 +498,38 @@ def get_user_portfolio():
 @jwt_required()
 def get_portfolio_summary():
     # Give a quick summary of the user's portfolio: total value, P&L, etc.
+    # Totals are computed in USD and converted to the user's display currency.
+    # Reports the price snapshot id used and each coin's price age.
     current_user_id = get_jwt_identity()
-    holdings = PortfolioHolding.query.filter_by(user_id=current_user_id).join(Crypto).all()
+    currency, rate = resolve_display_currency(current_user_id)
+    if rate is None:
+        return jsonify({"message": f"Unsupported currency '{currency}'"}), 400
+    holdings = holding_dicts(current_user_id)
     
-    # Get current prices from CoinGecko for all cryptos in portfolio
-    crypto_ids = [holding.crypto.api_id for holding in holdings]
-    current_prices = {}
-    
-    if crypto_ids:
-        try:
-            # Fetch current prices from CoinGecko
-            url = "https://api.coingecko.com/api/v3/simple/price"
-            params = {
-                'ids': ','.join(crypto_ids),
-                'vs_currencies': 'usd'
-            }
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            current_prices = response.json()
-        except Exception as e:
-            print(f"Error fetching current prices: {e}")
-            # Fallback to cached prices
-            current_prices = {}
+    # Bind one USD price snapshot (live from CoinGecko, or cached) for every holding
+    api_ids = [holding_dict['crypto']['api_id'] for holding_dict in holdings]
+    snapshot = request_snapshot(api_ids)
     
     total_current_value = 0
     total_cost_basis = 0
     
-    for holding in holdings:
-        # Get current price (live from CoinGecko or cached)
-        current_price = current_prices.get(holding.crypto.api_id, {}).get('usd', holding.crypto.last_updated_price)
-        if current_price is None:
-            current_price = holding.crypto.last_updated_price or 0
-        
-        total_current_value += holding.quantity * current_price
-        total_cost_basis += holding.quantity * holding.average_buy_price
+    for holding_dict in holdings:
+        current_price = get_quote(snapshot, holding_dict['crypto']['api_id']).price or 0
+        total_current_value += holding_dict['quantity'] * current_price
+        total_cost_basis += holding_dict['quantity'] * holding_dict['average_buy_price']
     
     total_gain_loss = total_current_value - total_cost_basis
     total_percentage_change = (total_gain_loss / total_cost_basis) * 100 if total_cost_basis else 0
     
     summary = {
-        "total_current_value": total_current_value,
-        "total_cost_basis": total_cost_basis,
-        "total_gain_loss": total_gain_loss,
+        "total_current_value": total_current_value * rate,
+        "total_cost_basis": total_cost_basis * rate,
+        "total_gain_loss": total_gain_loss * rate,
         "total_percentage_change": total_percentage_change,
-        "num_holdings": len(holdings)
+        "num_holdings": len(holdings),
+        "currency": currency,
+        "price_snapshot_id": snapshot.id,
+        "prices": {api_id: describe_quote(get_quote(snapshot, api_id)) for api_id in api_ids}
     }
     return jsonify(summary), 200
 
@@ -361,7 +538,12 @@ def get_portfolio_summary():
 @jwt_required()
 def get_portfolio_history():
     # Get portfolio value over the last 30 days using historical prices
+    # Historical prices are fetched in USD and converted to the user's display currency.
+    import requests
     current_user_id = get_jwt_identity()
+    currency, rate = resolve_display_currency(current_user_id)
+    if rate is None:
+        return jsonify({"message": f"Unsupported currency '{currency}'"}), 400
     holdings = PortfolioHolding.query.filter_by(user_id=current_user_id).join(Crypto).all()
     
     if not holdings:
@@ -382,7 +564,7 @@ def get_portfolio_history():
         for crypto_id in crypto_ids:
             url = f"https://api.coingecko.com/api/v3/coins/{crypto_id}/market_chart/range"
             params = {
-                'vs_currency': 'usd',
+                'vs_currency': BASE_CURRENCY,
                 'from': int(start_date.timestamp()),
                 'to': int(end_date.timestamp())
             }
@@ -423,7 +605,7 @@ def get_portfolio_history():
             
             portfolio_history.append({
                 'date': date_str,
-                'value': round(daily_value, 2)
+                'value': round(daily_value * rate, 2)
             })
             
     except Exception as e:
@@ -431,4 +613,49 @@ def get_portfolio_history():
         # Fallback: return empty array
         return jsonify([]), 200
     
-    return jsonify(portfolio_history), 200
\ No newline at end of file
+    return jsonify(portfolio_history), 200
+
+
+# ----------- ADMIN -----------
+
+@main_bp.route('/admin/aggregates', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_platform_aggregates():
+    # Platform-wide per-coin totals: holders, total quantity and assets under management (USD).
+    # Reads the incrementally maintained coin_aggregates table; no scan of holdings/transactions.
+    rows = db.session.execute(
+        db.select(CoinAggregate, Crypto).join(Crypto, CoinAggregate.crypto_id == Crypto.id)
+    ).all()
+    snapshot = request_snapshot([crypto.api_id for _, crypto in rows])
+    result = []
+    for aggregate, crypto in rows:
+        price = get_quote(snapshot, crypto.api_id).price or 0
+        aggregate_dict = aggregate.to_dict()
+        aggregate_dict['crypto_symbol'] = crypto.symbol
+        aggregate_dict['crypto_name'] = crypto.name
+        aggregate_dict['current_price'] = price
+        aggregate_dict['assets_under_management'] = aggregate.total_quantity * price
+        aggregate_dict['price_snapshot_id'] = snapshot.id
+        result.append(aggregate_dict)
+    result.sort(key=lambda item: item['assets_under_management'], reverse=True)
+    return jsonify(result), 200
+
+
+@main_bp.route('/admin/aggregates/flows', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_platform_flows():
+    # Per-coin net flow (buy value - sell value, USD) per day for the last ?days= days (default 30).
+    # Optional ?crypto_id= limits the result to one coin.
+    from datetime import timedelta
+    days = request.args.get('days', 30, type=int)
+    if not 1 <= days <= 3650:
+        return jsonify({"message": "days must be between 1 and 3650"}), 400
+    start_day = datetime.utcnow().date() - timedelta(days=days - 1)
+    query = CoinDailyFlow.query.filter(CoinDailyFlow.day >= start_day)
+    crypto_id = request.args.get('crypto_id', type=int)
+    if crypto_id is not None:
+        query = query.filter_by(crypto_id=crypto_id)
+    flows = query.order_by(CoinDailyFlow.day.asc(), CoinDailyFlow.crypto_id.asc()).all()
+    return jsonify([flow.to_dict() for flow in flows]), 200
@@ -0,0 +1,131 @@
+# server/app/serializers.py
+# Columnar serialization for list endpoints.
+# Instead of loading ORM objects and calling to_dict() on each (which hydrates every
+# attribute and lazily loads crypto/user relationships one query per row), these select
+# only the needed columns as tuples in a single joined query and build plain dicts.
+# The output matches the models' to_dict() exactly, so jsonify() produces the same bytes.
+
+from .models import db, User, Crypto, Transaction, PortfolioHolding
+from .utils import BASE_CURRENCY
+
+
+def _isoformat(value):
+    # Same date format as the models' to_dict(): ISO 8601 + 'Z' for UTC.
+    return value.isoformat() + 'Z' if value is not None else None
+
+
+def transaction_dicts(user_id, currency=BASE_CURRENCY, rate=1.0):
+    # The user's transactions, newest first, in Transaction.to_dict() shape plus 'currency'.
+    # Fiat amounts are multiplied by `rate` (see resolve_display_currency).
+    rows = db.session.execute(
+        db.select(
+            Transaction.id,
+            Transaction.user_id,
+            Transaction.crypto_id,
+            Transaction.transaction_type,
+            Transaction.quantity,
+            Transaction.price_per_coin,
+            Transaction.fiat_value,
+            Transaction.transaction_date,
+            Transaction.notes,
+            Crypto.symbol,
+            Crypto.name,
+            User.username,
+        )
+        .outerjoin(Crypto, Transaction.crypto_id == Crypto.id)
+        .outerjoin(User, Transaction.user_id == User.id)
+        .where(Transaction.user_id == user_id)
+        .order_by(Transaction.transaction_date.desc())
+    )
+    return [
+        {
+            'id': tx_id,
+            'user_id': tx_user_id,
+            'crypto_id': crypto_id,
+            'transaction_type': transaction_type,
+            'quantity': quantity,
+            'price_per_coin': price_per_coin * rate,
+            'fiat_value': fiat_value * rate,
+            'transaction_date': transaction_date.isoformat() + 'Z',
+            'notes': notes,
+            'crypto_symbol': crypto_symbol,
+            'crypto_name': crypto_name,
+            'username': username,
+            'currency': currency,
+        }
+        for (tx_id, tx_user_id, crypto_id, transaction_type, quantity, price_per_coin, fiat_value,
+             transaction_date, notes, crypto_symbol, crypto_name, username) in rows
+    ]
+
+
+def holding_dicts(user_id):
+    # The user's holdings in PortfolioHolding.to_dict() shape, plus the nested 'crypto'
+    # object the /portfolio route returns.
+    rows = db.session.execute(
+        db.select(
+            PortfolioHolding.id,
+            PortfolioHolding.user_id,
+            PortfolioHolding.crypto_id,
+            PortfolioHolding.quantity,
+            PortfolioHolding.average_buy_price,
+            PortfolioHolding.last_updated,
+            Crypto.name,
+            Crypto.symbol,
+            Crypto.api_id,
+            Crypto.logo_url,
+            User.username,
+        )
+        .join(Crypto, PortfolioHolding.crypto_id == Crypto.id)
+        .outerjoin(User, PortfolioHolding.user_id == User.id)
+        .where(PortfolioHolding.user_id == user_id)
+    )
+    return [
+        {
+            'id': holding_id,
+            'user_id': holding_user_id,
+            'crypto_id': crypto_id,
+            'quantity': quantity,
+            'average_buy_price': average_buy_price,
+            'last_updated': last_updated.isoformat() + 'Z',
+            'crypto_symbol': symbol,
+            'crypto_name': name,
+            'crypto_logo_url': logo_url,
+            'username': username,
+            'crypto': {
+                'id': crypto_id,
+                'name': name,
+                'symbol': symbol,
+                'api_id': api_id,
+                'logo_url': logo_url,
+            },
+        }
+        for (holding_id, holding_user_id, crypto_id, quantity, average_buy_price, last_updated,
+             name, symbol, api_id, logo_url, username) in rows
+    ]
+
+
+def crypto_dicts():
+    # All cryptocurrencies in Crypto.to_dict() shape.
+    rows = db.session.execute(
+        db.select(
+            Crypto.id,
+            Crypto.name,
+            Crypto.symbol,
+            Crypto.api_id,
+            Crypto.logo_url,
+            Crypto.last_updated_price,
+            Crypto.last_price_fetch_time,
+        )
+    )
+    return [
+        {
+            'id': crypto_id,
+            'name': name,
+            'symbol': symbol,
+            'api_id': api_id,
+            'logo_url': logo_url,
+            'last_updated_price': last_updated_price,
+            'last_price_fetch_time': _isoformat(last_price_fetch_time),
+        }
+        for (crypto_id, name, symbol, api_id, logo_url, last_updated_price, last_price_fetch_time) in rows
+    ]
@@ -0,0 +1,251 @@
+# server/app/utils.py
+# Helper functions shared by the API routes.
+
+import csv
+import io
+import json
+import threading
+import time
+
+from .models import db, Crypto, Transaction
+
+# Number of rows pulled from the database cursor at a time when streaming exports.
+EXPORT_BATCH_SIZE = 1000
+
+# Columns included in transaction exports, in output order.
+# Fiat amounts are exported as stored (USD, see BASE_CURRENCY) and labelled by 'currency'.
+EXPORT_FIELDS = [
+    'id', 'transaction_date', 'transaction_type', 'crypto_id', 'crypto_symbol',
+    'crypto_name', 'quantity', 'price_per_coin', 'fiat_value', 'currency', 'notes'
+]
+
+# Columns included in the realized gains report, in output order (amounts in USD, as above).
+REALIZED_GAIN_FIELDS = [
+    'transaction_id', 'transaction_date', 'crypto_id', 'crypto_symbol', 'crypto_name',
+    'quantity', 'sale_price', 'proceeds', 'average_cost', 'cost_basis', 'realized_gain', 'currency'
+]
+
+# Quantities below this are treated as an empty position (same threshold as add_transaction).
+DUST_QUANTITY = 0.0000001
+
+
+# ----------- STREAMING EXPORTS -----------
+
+def iter_transaction_rows(user_id, end_date=None, batch_size=EXPORT_BATCH_SIZE):
+    # Yield the user's transactions oldest first as plain dicts.
+    # Rows come from a server-side cursor in batches, so only one batch is held in memory.
+    stmt = (
+        db.select(
+            Transaction.id,
+            Transaction.transaction_date,
+            Transaction.transaction_type,
+            Transaction.crypto_id,
+            Crypto.symbol,
+            Crypto.name,
+            Transaction.quantity,
+            Transaction.price_per_coin,
+            Transaction.fiat_value,
+            Transaction.notes,
+        )
+        .join(Crypto, Transaction.crypto_id == Crypto.id)
+        .where(Transaction.user_id == user_id)
+        .order_by(Transaction.transaction_date.asc(), Transaction.id.asc())
+        .execution_options(yield_per=batch_size)
+    )
+    if end_date is not None:
+        stmt = stmt.where(Transaction.transaction_date < end_date)
+
+    result = db.session.execute(stmt)
+    try:
+        for batch in result.partitions():
+            for row in batch:
+                yield {
+                    'id': row.id,
+                    'transaction_date': row.transaction_date.isoformat() + 'Z',
+                    'transaction_type': row.transaction_type,
+                    'crypto_id': row.crypto_id,
+                    'crypto_symbol': row.symbol,
+                    'crypto_name': row.name,
+                    'quantity': row.quantity,
+                    'price_per_coin': row.price_per_coin,
+                    'fiat_value': row.fiat_value,
+                    'currency': BASE_CURRENCY,
+                    'notes': row.notes,
+                    '_date': row.transaction_date,
+                }
+    finally:
+        result.close()
+
+
+def iter_realized_gains(rows, start_date=None):
+    # Compute realized gains for every sell in a single forward pass over rows (oldest first).
+    # Uses the average cost method, the same way add_transaction maintains average_buy_price.
+    # Only a (quantity, average_cost) pair per coin is kept, so memory does not grow with history.
+    # Sells before start_date still update positions but are not yielded.
+    positions = {}
+    for row in rows:
+        quantity, average_cost = positions.get(row['crypto_id'], (0.0, 0.0))
+        if row['transaction_type'] == 'buy':
+            new_quantity = quantity + row['quantity']
+            average_cost = ((quantity * average_cost) + row['fiat_value']) / new_quantity
+            positions[row['crypto_id']] = (new_quantity, average_cost)
+            continue
+
+        sold = row['quantity']
+        remaining = quantity - sold
+        if remaining <= DUST_QUANTITY:
+            positions.pop(row['crypto_id'], None)
+        else:
+            positions[row['crypto_id']] = (remaining, average_cost)
+
+        if start_date is not None and row['_date'] < start_date:
+            continue
+
+        proceeds = sold * row['price_per_coin']
+        cost_basis = sold * average_cost
+        yield {
+            'transaction_id': row['id'],
+            'transaction_date': row['transaction_date'],
+            'crypto_id': row['crypto_id'],
+            'crypto_symbol': row['crypto_symbol'],
+            'crypto_name': row['crypto_name'],
+            'quantity': sold,
+            'sale_price': row['price_per_coin'],
+            'proceeds': proceeds,
+            'average_cost': average_cost,
+            'cost_basis': cost_basis,
+            'realized_gain': proceeds - cost_basis,
+            'currency': row['currency'],
+        }
+
+
+def stream_csv(records, fields):
+    # Encode records as CSV, yielding one chunk per batch of rows.
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction='ignore')
+    writer.writeheader()
+    count = 0
+    for record in records:
+        writer.writerow(record)
+        count += 1
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue()
+
+
+def stream_json_array(records, fields):
+    # Encode records as a JSON array without building the whole list in memory.
+    yield '['
+    first = True
+    for record in records:
+        item = json.dumps({field: record[field] for field in fields})
+        yield item if first else ',' + item
+        first = False
+    yield ']'
+
+
+def stream_realized_gains_json(gains):
+    # Encode the realized gains report as {"sales": [...], "totals": {...}}.
+    # Totals are accumulated while the sales stream past and written at the end.
+    totals = {'proceeds': 0.0, 'cost_basis': 0.0, 'realized_gain': 0.0, 'num_sales': 0, 'currency': BASE_CURRENCY}
+
+    def tally():
+        for gain in gains:
+            totals['proceeds'] += gain['proceeds']
+            totals['cost_basis'] += gain['cost_basis']
+            totals['realized_gain'] += gain['realized_gain']
+            totals['num_sales'] += 1
+            yield gain
+
+    yield '{"sales": '
+    yield from stream_json_array(tally(), REALIZED_GAIN_FIELDS)
+    yield ', "totals": ' + json.dumps(totals) + '}'
+
+
+# ----------- PRICES & CURRENCIES -----------
+
+# All coin prices are fetched from CoinGecko in this currency and converted locally.
+BASE_CURRENCY = 'usd'
+
+# How long (seconds) the fiat cross-rate table is used before it is refreshed.
+FIAT_RATES_TTL = 3600
+
+# How long (seconds) to wait before retrying after a failed refresh.
+FIAT_RATES_RETRY_SECONDS = 60
+
+# Fiat cross-rate table: currency code -> units of that currency per 1 USD.
+# Starts with USD only so the app still works if CoinGecko has never been reachable.
+_fiat_rates = {BASE_CURRENCY: 1.0}
+_fiat_rates_fetched_at = 0.0
+_fiat_rates_lock = threading.Lock()
+
+
+def fetch_usd_prices(api_ids):
+    # Fetch current USD prices for the given CoinGecko ids in one request.
+    # Returns {api_id: price}; coins CoinGecko doesn't return (or any error) are simply missing.
+    if not api_ids:
+        return {}
+    import requests  # Imported lazily to keep app startup fast
+    try:
+        url = "https://api.coingecko.com/api/v3/simple/price"
+        params = {
+            'ids': ','.join(api_ids),
+            'vs_currencies': BASE_CURRENCY
+        }
+        response = requests.get(url, params=params, timeout=10)
+        response.raise_for_status()
+        data = response.json()
+    except Exception as e:
+        print(f"Error fetching current prices: {e}")
+        return {}
+    return {
+        api_id: values[BASE_CURRENCY]
+        for api_id, values in data.items()
+        if values.get(BASE_CURRENCY) is not None
+    }
+
+
+def _refresh_fiat_rates():
+    # Rebuild the cross-rate table from CoinGecko's BTC-denominated exchange rates.
+    global _fiat_rates, _fiat_rates_fetched_at
+    import requests  # Imported lazily to keep app startup fast
+    try:
+        response = requests.get("https://api.coingecko.com/api/v3/exchange_rates", timeout=10)
+        response.raise_for_status()
+        rates = response.json()['rates']
+        usd_per_btc = rates[BASE_CURRENCY]['value']
+        _fiat_rates = {
+            code: entry['value'] / usd_per_btc
+            for code, entry in rates.items()
+            if entry.get('type') == 'fiat'
+        }
+        _fiat_rates[BASE_CURRENCY] = 1.0
+        _fiat_rates_fetched_at = time.time()
+    except Exception as e:
+        # Keep serving the previous table, but retry after FIAT_RATES_RETRY_SECONDS rather than a full TTL.
+        print(f"Error fetching fiat exchange rates: {e}")
+        _fiat_rates_fetched_at = time.time() - FIAT_RATES_TTL + FIAT_RATES_RETRY_SECONDS
+
+
+def get_fiat_rates():
+    # Return the current cross-rate table, refreshing it when it is older than FIAT_RATES_TTL.
+    # Only one thread refreshes; the others keep using the existing table instead of waiting.
+    if time.time() - _fiat_rates_fetched_at > FIAT_RATES_TTL and _fiat_rates_lock.acquire(blocking=False):
+        try:
+            if time.time() - _fiat_rates_fetched_at > FIAT_RATES_TTL:
+                _refresh_fiat_rates()
+        finally:
+            _fiat_rates_lock.release()
+    return _fiat_rates
+
+
+def get_fiat_rate(currency):
+    # Units of `currency` per 1 USD, or None if the currency isn't supported.
+    if not currency:
+        return None
+    currency = currency.lower()
+    if currency == BASE_CURRENCY:
+        return 1.0
+    return get_fiat_rates().get(currency)
@@ -0,0 +1,103 @@
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Use a throwaway in-memory database; must be set before the app loads .env
+os.environ['DATABASE_URI'] = 'sqlite://'
+
+# Add the current directory to Python path so we can import from app
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from flask import jsonify
+from app import create_app, db
+from app.models import User, Crypto, Transaction
+from app.serializers import transaction_dicts
+
+
+def seed(num_rows):
+    """Create one user with num_rows transactions spread over 100 coins"""
+    user = User(username='bench', email='bench@example.com', password_hash='')
+    db.session.add(user)
+    cryptos = [
+        Crypto(name=f'Coin {i}', symbol=f'C{i}', api_id=f'coin-{i}', logo_url=f'https://example.com/{i}.png')
+        for i in range(100)
+    ]
+    db.session.add_all(cryptos)
+    db.session.flush()
+    start = datetime(2024, 1, 1)
+    db.session.add_all(
+        Transaction(
+            user_id=user.id,
+            crypto_id=cryptos[i % 100].id,
+            transaction_type='buy' if i % 3 else 'sell',
+            quantity=0.1 + i / 7,
+            price_per_coin=100 + i / 3,
+            fiat_value=(0.1 + i / 7) * (100 + i / 3),
+            transaction_date=start + timedelta(minutes=i),
+            notes=f'note {i}' if i % 2 else None
+        )
+        for i in range(num_rows)
+    )
+    db.session.commit()
+    return user.id
+
+
+def legacy_response(user_id):
+    """The previous /transactions implementation: ORM objects + to_dict()"""
+    transactions = Transaction.query.filter_by(user_id=user_id).order_by(Transaction.transaction_date.desc()).all()
+    result = []
+    for tx in transactions:
+        tx_dict = tx.to_dict()
+        tx_dict['currency'] = 'usd'
+        result.append(tx_dict)
+    return jsonify(result)
+
+
+def columnar_response(user_id):
+    """The current /transactions implementation: column tuples -> dicts"""
+    return jsonify(transaction_dicts(user_id, 'usd', 1.0))
+
+
+def time_it(fn, user_id, runs):
+    """Median wall time (ms) of fn over runs, each starting from an empty session"""
+    timings = []
+    body = None
+    for _ in range(runs):
+        db.session.remove()
+        t0 = time.perf_counter()
+        body = fn(user_id).get_data()
+        timings.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(timings), body
+
+
+def main():
+    """Compare legacy and columnar serialization of the transactions list"""
+    parser = argparse.ArgumentParser(description="Benchmark list endpoint serialization")
+    parser.add_argument('--rows', type=int, default=10000, help="number of transactions to serialize")
+    parser.add_argument('--runs', type=int, default=5, help="timed runs per implementation")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        user_id = seed(args.rows)
+
+        print(f"=== Serialization Benchmark ({args.rows} transactions) ===")
+        legacy_ms, legacy_body = time_it(legacy_response, user_id, args.runs)
+        columnar_ms, columnar_body = time_it(columnar_response, user_id, args.runs)
+
+        print(f"  legacy to_dict: {legacy_ms:8.1f} ms")
+        print(f"  columnar:       {columnar_ms:8.1f} ms")
+        print(f"  speedup:        {legacy_ms / columnar_ms:8.1f}x")
+
+        if legacy_body != columnar_body:
+            print("❌ Output differs from the legacy serializer")
+            sys.exit(1)
+        print("\n✅ Output is byte-identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Code run in a fresh interpreter for each sample, so every run is a true cold start.
+# It times importing the app package, building the app, and serving the first request,
+# and records whether any heavy optional dependency got imported along the way.
+PROBE = r"""
+import json, sys, time
+t0 = time.perf_counter()
+from app import create_app
+t1 = time.perf_counter()
+app = create_app()
+t2 = time.perf_counter()
+response = app.test_client().get('/health')
+t3 = time.perf_counter()
+# The engine loads its own database's dialect; any other SQLAlchemy dialect is dead weight
+backend = app.config['SQLALCHEMY_DATABASE_URI'].split(':', 1)[0].split('+', 1)[0]
+heavy_modules = ['requests', 'google.oauth2', 'google.auth.transport'] + [
+    f'sqlalchemy.dialects.{dialect}' for dialect in ('postgresql', 'sqlite', 'mysql') if dialect != backend
+]
+print(json.dumps({
+    'import_ms': (t1 - t0) * 1000,
+    'create_app_ms': (t2 - t1) * 1000,
+    'first_response_ms': (t3 - t2) * 1000,
+    'total_ms': (t3 - t0) * 1000,
+    'status': response.status_code,
+    'heavy_modules': sorted(m for m in heavy_modules if m in sys.modules),
+}))
+"""
+
+
+def run_probe():
+    """Run one cold start in a subprocess and return its timings"""
+    server_dir = os.path.dirname(os.path.abspath(__file__))
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE],
+        cwd=server_dir,
+        capture_output=True,
+        text=True,
+        check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    """Benchmark app import time and time-to-first-response"""
+    parser = argparse.ArgumentParser(description="Measure cold start time of the API server")
+    parser.add_argument('--runs', type=int, default=5, help="number of cold starts to sample")
+    parser.add_argument('--max-ms', type=float, default=None,
+                        help="fail if the median total startup time exceeds this many milliseconds")
+    args = parser.parse_args()
+
+    print("=== Startup Benchmark ===")
+    samples = [run_probe() for _ in range(args.runs)]
+
+    for key in ['import_ms', 'create_app_ms', 'first_response_ms', 'total_ms']:
+        values = [sample[key] for sample in samples]
+        print(f"{key:>18}: median {statistics.median(values):8.1f}  min {min(values):8.1f}  max {max(values):8.1f}")
+
+    failed = False
+    if any(sample['status'] != 200 for sample in samples):
+        print("❌ /health did not return 200")
+        failed = True
+    heavy = samples[0]['heavy_modules']
+    if heavy:
+        print(f"❌ Heavy modules imported at startup: {', '.join(heavy)}")
+        failed = True
+    median_total = statistics.median(sample['total_ms'] for sample in samples)
+    if args.max_ms is not None and median_total > args.max_ms:
+        print(f"❌ Median startup {median_total:.1f}ms exceeds budget of {args.max_ms:.1f}ms")
+        failed = True
+
+    if failed:
+        sys.exit(1)
+    print("\n✅ Startup is within budget")
+
+
+if __name__ == "__main__":
+    main()